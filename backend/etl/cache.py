@@ -0,0 +1,27 @@
+"""
+Local ETL Cache Storage
+=======================
+SQLite files shared by the pipeline's on-disk caches.
+Kept out of Supabase on purpose: these are per-machine and safe to delete.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("ETL_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+
+
+def open_cache_db(name: str) -> sqlite3.Connection:
+    """
+    Open (creating if needed) the SQLite cache file `<CACHE_DIR>/<name>.sqlite3`.
+    The connection may be shared across threads; callers serialize access.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_DIR / f"{name}.sqlite3", check_same_thread=False)
+    # Commits append to the write-ahead log instead of rewriting pages through a
+    # rollback journal; NORMAL skips the fsync per commit (a crash loses at most
+    # the last few cache entries, which is fine for a cache)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,110 @@
+"""
+Circuit Breaker
+===============
+Stops the pipeline from hammering an upstream API that is hard-down.
+
+After `failure_threshold` consecutive failures the breaker OPENs and rejects
+calls immediately for `recovery_timeout` seconds. It then lets a single trial
+call through (HALF_OPEN): success closes it again, failure re-opens it.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 60.0,
+        is_failure: Callable[[BaseException], bool] = lambda e: True,
+    ):
+        self.name = name
+        # Decides which exceptions mean "upstream is down"; others (e.g. 429s) pass through uncounted
+        self.is_failure = is_failure
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._fail_count = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                # Let exactly one trial call through
+                self._state = self.HALF_OPEN
+                logger.info(f"[circuit:{self.name}] Half-open, trying upstream again")
+                return True
+            return False
+
+    def _record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"[circuit:{self.name}] Closed")
+            self._state = self.CLOSED
+            self._fail_count = 0
+            self._opened_at = None
+
+    def _record_failure(self):
+        with self._lock:
+            self._fail_count += 1
+            if self._state == self.HALF_OPEN or self._fail_count >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"[circuit:{self.name}] Open after {self._fail_count} consecutive failure(s), "
+                        f"failing fast for {self.recovery_timeout:.0f}s"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def _record_outcome(self, error: Exception):
+        if self.is_failure(error):
+            self._record_failure()
+        else:
+            # Upstream answered (just not the way we wanted); it isn't down
+            self._record_success()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call `fn` through the breaker. Raises CircuitOpenError while open."""
+        if not self._allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record_outcome(e)
+            raise
+        self._record_success()
+        return result
+
+    async def call_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await `fn` through the breaker. Raises CircuitOpenError while open."""
+        if not self._allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self._record_outcome(e)
+            raise
+        self._record_success()
+        return result
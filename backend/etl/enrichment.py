@@ -1,13 +1,33 @@
 import os
+import time
+import asyncio
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from google.maps import places_v1
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from etl.cache import open_cache_db
+from etl.circuit import CircuitBreaker, CircuitOpenError
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+
+# Max Places requests in flight at once (keeps us well under the QPS quota)
+DEFAULT_CONCURRENCY = 8
+# Lookups are memoized in-process and persisted between runs
+PLACE_CACHE_SIZE = 2048
+PLACE_CACHE_TTL_SECONDS = 30 * 24 * 3600
+# Request only the minimal fields (Basic SKU): id, displayName, formattedAddress, location, priceLevel, googleMapsUri
+FIELD_MASK_METADATA = [(
+    "x-goog-fieldmask",
+    "places.id,places.displayName,places.formattedAddress,places.location,places.priceLevel,places.googleMapsUri",
+)]
+
 class GooglePlaceDTO(BaseModel):
     """Internal DTO to carry data from Google to our models (Basic SKU).
     Excludes photos, ratings, and reviews to reduce API cost."""
@@ -19,59 +39,213 @@ class GooglePlaceDTO(BaseModel):
     price_level: Optional[int] = None
     google_maps_url: str
 
+def _name_key(restaurant_name: str) -> str:
+    """Normalize a name so trivially different spellings share a cache entry."""
+    return " ".join(restaurant_name.lower().split())
+
 class GooglePlacesEnricher:
-    def __init__(self):
-        self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    def __init__(self, persist_cache: bool = True):
+        self.api_key = GOOGLE_MAPS_API_KEY
         self.client = places_v1.PlacesClient(client_options={"api_key": self.api_key}) if self.api_key else None
+        self._cache: "OrderedDict[Tuple[str, str], Optional[GooglePlaceDTO]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._db = self._open_cache_db() if persist_cache else None
+        self.breaker = CircuitBreaker("google_places")
+        self._async_client = None
+        self._async_loop = None
+
+    def _open_cache_db(self):
+        try:
+            conn = open_cache_db("places")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS place_cache (
+                    name_key TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    dto_json TEXT NOT NULL,
+                    cached_at REAL NOT NULL,
+                    PRIMARY KEY (name_key, city)
+                )
+                """
+            )
+            conn.commit()
+            return conn
+        except Exception as e:
+            logger.warning(f"[enricher] Place cache unavailable, continuing without it: {e}")
+            return None
+
+    def _cache_get(self, key: Tuple[str, str]) -> Tuple[bool, Optional[GooglePlaceDTO]]:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True, self._cache[key]
+            if self._db is None:
+                return False, None
+            row = self._db.execute(
+                "SELECT dto_json FROM place_cache WHERE name_key = ? AND city = ? AND cached_at >= ?",
+                (key[0], key[1], time.time() - PLACE_CACHE_TTL_SECONDS),
+            ).fetchone()
+        if not row:
+            return False, None
+        place = GooglePlaceDTO.model_validate_json(row[0])
+        self._cache_put(key, place, persist=False)
+        return True, place
+
+    def _cache_put(self, key: Tuple[str, str], place: Optional[GooglePlaceDTO], persist: bool = True):
+        with self._cache_lock:
+            self._cache[key] = place
+            self._cache.move_to_end(key)
+            while len(self._cache) > PLACE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            # Misses stay in memory only; the place may exist by the next run
+            if persist and place is not None and self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO place_cache (name_key, city, dto_json, cached_at) VALUES (?, ?, ?, ?)",
+                    (key[0], key[1], place.model_dump_json(), time.time()),
+                )
+                self._db.commit()
 
     def find_place(self, restaurant_name: str, city: str = "Toronto") -> Optional[GooglePlaceDTO]:
         if not self.client:
             logger.error("Google Places Client not initialized.")
             return None
-        
+
+        key = (_name_key(restaurant_name), city)
+        hit, place = self._cache_get(key)
+        if hit:
+            logger.info(f"[enricher] Cache hit for: {restaurant_name}")
+            return place
+
         try:
-            logger.info(f"[enricher] Starting find_place for: {restaurant_name}")
-            # Request only the minimal fields (Basic SKU): id, displayName, formattedAddress, location, priceLevel, googleMapsUri
-            field_mask = "places.id,places.displayName,places.formattedAddress,places.location,places.priceLevel,places.googleMapsUri"
-            
-            # Location bias as a dict, not a class instantiation
-            request = {
-                "text_query": f"{restaurant_name} {city}",
-                "max_result_count": 1,
-                "location_bias": {
-                    "circle": {
-                        "center": {"latitude": 43.6532, "longitude": -79.3832},
-                        "radius": 5000.0
-                    }
+            place = self.breaker.call(self._search_place, restaurant_name, city)
+        except CircuitOpenError:
+            logger.warning(f"[enricher] Google Places circuit open, skipping {restaurant_name}")
+            return None
+        except Exception as e:
+            logger.error(f"[enricher] Google Enrichment failed for {restaurant_name}: {e}")
+            return None
+
+        self._cache_put(key, place)
+        return place
+
+    def _build_request(self, restaurant_name: str, city: str) -> dict:
+        # Location bias as a dict, not a class instantiation
+        return {
+            "text_query": f"{restaurant_name} {city}",
+            "max_result_count": 1,
+            "location_bias": {
+                "circle": {
+                    "center": {"latitude": 43.6532, "longitude": -79.3832},
+                    "radius": 5000.0
                 }
             }
-            
-            logger.info(f"[enricher] Making Google Places API call...")
-            response = self.client.search_text(request=request, metadata=[("x-goog-fieldmask", field_mask)])
-            logger.info(f"[enricher] API response received")
-            
-            if not response.places:
-                logger.info(f"[enricher] No places found for {restaurant_name}")
-                return None
-            
-            place = response.places[0]
-            logger.info(f"[enricher] Found place: {place.display_name.text if place.display_name else restaurant_name}")
-
-            return GooglePlaceDTO(
-                place_id=place.id,
-                name=place.display_name.text if place.display_name else restaurant_name,
-                address=place.formatted_address,
-                latitude=place.location.latitude,
-                longitude=place.location.longitude,
-                price_level=int(place.price_level) if place.price_level else None,
-                google_maps_url=place.google_maps_uri,
-            )
+        }
+
+    def _to_dto(self, response, restaurant_name: str) -> Optional[GooglePlaceDTO]:
+        if not response.places:
+            logger.info(f"[enricher] No places found for {restaurant_name}")
+            return None
+        
+        place = response.places[0]
+        logger.info(f"[enricher] Found place: {place.display_name.text if place.display_name else restaurant_name}")
+
+        return GooglePlaceDTO(
+            place_id=place.id,
+            name=place.display_name.text if place.display_name else restaurant_name,
+            address=place.formatted_address,
+            latitude=place.location.latitude,
+            longitude=place.location.longitude,
+            price_level=int(place.price_level) if place.price_level else None,
+            google_maps_url=place.google_maps_uri,
+        )
+
+    def _search_place(self, restaurant_name: str, city: str) -> Optional[GooglePlaceDTO]:
+        logger.info(f"[enricher] Starting find_place for: {restaurant_name}")
+        response = self.client.search_text(
+            request=self._build_request(restaurant_name, city), metadata=FIELD_MASK_METADATA
+        )
+        return self._to_dto(response, restaurant_name)
+
+    async def _get_async_client(self) -> "places_v1.PlacesAsyncClient":
+        """One async (HTTP/2) client per event loop; concurrent RPCs share its channel."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # Swap before any await so concurrent callers all see (and share) the new client
+            stale = self._async_client
+            self._async_client = places_v1.PlacesAsyncClient(client_options={"api_key": self.api_key})
+            self._async_loop = loop
+            # A client left over from an earlier loop is unusable here; close its channel
+            await self._close_client(stale)
+        return self._async_client
+
+    async def aclose(self):
+        """Close the async client's gRPC channel, if one was opened."""
+        client, self._async_client, self._async_loop = self._async_client, None, None
+        await self._close_client(client)
+
+    @staticmethod
+    async def _close_client(client: Optional["places_v1.PlacesAsyncClient"]):
+        if client is None:
+            return
+        try:
+            await client.transport.close()
+        except Exception as e:
+            logger.warning(f"[enricher] Failed to close Places async client: {e}")
+
+    async def _search_place_async(self, restaurant_name: str, city: str) -> Optional[GooglePlaceDTO]:
+        logger.info(f"[enricher] Starting async find_place for: {restaurant_name}")
+        client = await self._get_async_client()
+        response = await client.search_text(
+            request=self._build_request(restaurant_name, city), metadata=FIELD_MASK_METADATA
+        )
+        return self._to_dto(response, restaurant_name)
+
+    async def find_place_async(self, restaurant_name: str, city: str = "Toronto") -> Optional[GooglePlaceDTO]:
+        """find_place over the async client; same caching and circuit breaking."""
+        if not self.client:
+            logger.error("Google Places Client not initialized.")
+            return None
+
+        key = (_name_key(restaurant_name), city)
+        hit, place = self._cache_get(key)
+        if hit:
+            logger.info(f"[enricher] Cache hit for: {restaurant_name}")
+            return place
+
+        try:
+            place = await self.breaker.call_async(self._search_place_async, restaurant_name, city)
+        except CircuitOpenError:
+            logger.warning(f"[enricher] Google Places circuit open, skipping {restaurant_name}")
+            return None
         except Exception as e:
             logger.error(f"[enricher] Google Enrichment failed for {restaurant_name}: {e}")
             return None
 
-_enricher = None
-def get_enricher():
+        self._cache_put(key, place)
+        return place
+
+    async def find_places_async(
+        self,
+        restaurant_names: List[str],
+        city: str = "Toronto",
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> Dict[str, Optional[GooglePlaceDTO]]:
+        """
+        Look up many names concurrently, at most `concurrency` RPCs in flight
+        on one HTTP/2 connection. Duplicate names are only looked up once.
+        """
+        names = list(dict.fromkeys(restaurant_names))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(name: str) -> Optional[GooglePlaceDTO]:
+            async with semaphore:
+                return await self.find_place_async(name, city)
+
+        places = await asyncio.gather(*(bounded(name) for name in names))
+        return dict(zip(names, places))
+
+_enricher: Optional[GooglePlacesEnricher] = None
+def get_enricher() -> GooglePlacesEnricher:
     global _enricher
     if _enricher is None:
         _enricher = GooglePlacesEnricher()
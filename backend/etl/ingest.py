@@ -1,19 +1,22 @@
 import re
+import asyncio
 import logging
-from typing import Optional, Dict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional, Dict, List, Tuple
 
 from dotenv import load_dotenv
+from postgrest.exceptions import APIError
 from etl.db import get_supabase
 from shared.models import (
+    ExtractedRestaurant,
     Restaurant,
     RestaurantMetrics,
     SocialMention,
 )
-from shared.embeddings.embeddings import get_embedding_service
-from .scrapers.content import ContentScraper
-from .llm.extractor import RestaurantExtractor
-from .enrichment import GooglePlacesEnricher
+from .services import Services, create_services
 from .scoring import calculate_metrics
+from .enrichment import GooglePlaceDTO
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -22,10 +25,16 @@ logger = logging.getLogger(__name__)
 # HELPERS
 # =============================================================================
 
+_SLUG_STRIP = re.compile(r"[^a-z0-9\s-]")
+_SLUG_SPACE = re.compile(r"[\s_]+")
+_SLUG_DASH = re.compile(r"-+")
+
+@lru_cache(maxsize=4096)
 def create_slug(name: str) -> str:
     slug = name.lower()
-    slug = re.sub(r"[^a-z0-9\s-]", "", slug)
-    slug = re.sub(r"[\s_]+", "-", slug)
+    slug = _SLUG_STRIP.sub("", slug)
+    slug = _SLUG_SPACE.sub("-", slug)
+    slug = _SLUG_DASH.sub("-", slug)
     return slug.strip("-")
 
 def price_hint_to_tier(price_hint: Optional[str], google_price: Optional[int]) -> int:
@@ -40,35 +49,88 @@ def price_hint_to_tier(price_hint: Optional[str], google_price: Optional[int]) -
     if any(k in hint for k in ["$$", "moderate"]): return 2
     return 1
 
-def upsert_restaurant_core(supabase, restaurant: Restaurant) -> Optional[str]:
-    """Upserts identity and returns UUID."""
-    data = restaurant.model_dump(exclude={"id"})
+def _in_halves(upsert_batch: Callable[[list], list], items: list, what: str) -> list:
+    """
+    Run `upsert_batch` on the whole batch; if PostgREST rejects it (e.g. one row
+    violates a constraint), retry each half so a bad row only loses itself.
+    Returns one result per item, None for rows that could not be written.
+    Transport errors and timeouts are re-raised: splitting won't help if Supabase is down.
+    """
+    try:
+        return upsert_batch(items)
+    except APIError as e:
+        if len(items) == 1:
+            logger.error(f"{what} upsert failed for one row: {e}")
+            return [None]
+        logger.warning(f"{what} batch of {len(items)} failed, retrying in halves: {e}")
+    mid = len(items) // 2
+    return _in_halves(upsert_batch, items[:mid], what) + _in_halves(upsert_batch, items[mid:], what)
+
+def _upsert_rows(supabase, table: str, rows: List[dict], on_conflict: str) -> List[bool]:
+    supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+    return [True] * len(rows)
+
+def _upsert_restaurant_batch(supabase, restaurants: List[Restaurant]) -> List[Optional[str]]:
+    data = [r.model_dump(mode="json", exclude={"id"}) for r in restaurants]
     # Ensure embedding is handled by pgvector
-    res = (
-        supabase
-        .table("restaurants")
-        .upsert(data, on_conflict="google_place_id")
-        .select("id")
-        .execute()
-    )
-    rid = res.data[0]["id"] if res.data else None
-    logger.info(f"Upserted restaurant {restaurant.name}: id={rid}, rows={len(res.data)}")
-    return rid
+    res = supabase.table("restaurants").upsert(data, on_conflict="google_place_id").execute()
+    rows = res.data or []
+
+    by_place_id = {row["google_place_id"]: row["id"] for row in rows if row.get("google_place_id")}
+    # Rows without a place id can only be matched positionally (RETURNING keeps input order)
+    positional = len(rows) == len(restaurants)
+    ids = []
+    for i, restaurant in enumerate(restaurants):
+        if restaurant.google_place_id:
+            ids.append(by_place_id.get(restaurant.google_place_id))
+        else:
+            ids.append(rows[i]["id"] if positional else None)
+    return ids
+
+def upsert_restaurants(supabase, restaurants: List[Restaurant]) -> List[Optional[str]]:
+    """Upserts identities in one request and returns their UUIDs in input order."""
+    if not restaurants:
+        return []
+    ids = _in_halves(lambda batch: _upsert_restaurant_batch(supabase, batch), restaurants, "Restaurant")
+    logger.info(f"Upserted {sum(1 for i in ids if i)}/{len(restaurants)} restaurant(s)")
+    return ids
 
-def upsert_metrics(supabase, metrics: RestaurantMetrics):
+def upsert_metrics(supabase, metrics: List[RestaurantMetrics]):
     """Saves buzz/sentiment scores."""
-    data = metrics.model_dump()
-    res = supabase.table("restaurant_metrics").upsert(data, on_conflict="restaurant_id").execute()
-    logger.info(f"Upserted metrics for {metrics.restaurant_id}: buzz={metrics.buzz_score}")
-
-def upsert_mention(supabase, mention: SocialMention, restaurant_id: str):
-    """Saves social proof linked to restaurant."""
-    data = mention.model_dump(exclude={"id"})
-    data["restaurant_id"] = restaurant_id
-    # Ensure Enum to String conversion
-    data["source_type"] = data["source_type"].value if hasattr(data["source_type"], "value") else data["source_type"]
-    res = supabase.table("social_mentions").upsert(data, on_conflict="source_url").execute()
-    logger.info(f"Upserted mention {mention.source_url[:50]} for restaurant {restaurant_id}")
+    # One row per restaurant; a batch may not touch the same conflict key twice
+    data = list({m.restaurant_id: m.model_dump(mode="json") for m in metrics}.values())
+    if not data:
+        return
+    written = _in_halves(
+        lambda rows: _upsert_rows(supabase, "restaurant_metrics", rows, "restaurant_id"), data, "Metrics"
+    )
+    logger.info(f"Upserted metrics for {sum(1 for w in written if w)}/{len(data)} restaurant(s)")
+
+def upsert_mentions(supabase, mentions: List[Tuple[SocialMention, str]]):
+    """Saves social proof linked to restaurants, given (mention, restaurant_id) pairs."""
+    data = {}
+    for mention, restaurant_id in mentions:
+        row = mention.model_dump(mode="json", exclude={"id"})
+        row["restaurant_id"] = restaurant_id
+        # A post naming several restaurants shares one source_url; last one wins, as before
+        data[mention.source_url] = row
+    if not data:
+        return
+    written = _in_halves(
+        lambda rows: _upsert_rows(supabase, "social_mentions", rows, "source_url"), list(data.values()), "Mention"
+    )
+    logger.info(f"Upserted {sum(1 for w in written if w)}/{len(data)} mention(s)")
+
+@dataclass(slots=True)
+class QueuedRestaurant:
+    """One resolved restaurant and everything the pipeline gathers for it."""
+    key: str
+    ext: ExtractedRestaurant
+    place: Optional[GooglePlaceDTO]
+    mentions: List[SocialMention] = field(default_factory=list)
+    restaurant: Optional[Restaurant] = None
+    buzz: float = 0.0
+    sentiment: float = 0.0
 
 # =============================================================================
 # MAIN PIPELINE
@@ -78,26 +140,47 @@ async def run_pipeline(limit: int = 50):
     import logging
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
     supabase = get_supabase()
-    scraper = ContentScraper()
-    extractor = RestaurantExtractor()
-    enricher = GooglePlacesEnricher()
-    embedder = get_embedding_service()
+    async with create_services() as services:
+        await _run(services, supabase, limit)
+
+async def _run(services: Services, supabase, limit: int):
+    # Every blocking call goes to the shared pool so the phases can overlap
+    loop = asyncio.get_running_loop()
+    pool = services.pool
+    embedder = services.embedder
+
+    # Without an LLM nothing scraped can become a restaurant; don't scrape at all
+    if services.extractor.client is None:
+        logger.error("GROQ_API_KEY not set, skipping pipeline run")
+        return
     embedder.load()
 
-    raw_content = scraper.scrape_all(blog_limit=limit)
+    raw_content = await loop.run_in_executor(pool, lambda: services.content_scraper.scrape_all(blog_limit=limit))
     logger.info(f"Scraped {len(raw_content)} items")
-    queue: Dict[str, Dict] = {}
+    queue: Dict[str, QueuedRestaurant] = {}
 
-    for item in raw_content:
-        extracted_list, sentiment = extractor.process_content(item)
+    # LLM calls overlap across items instead of running one after another
+    results = await services.extractor.process_contents_async(raw_content, executor=pool)
+    extracted = [(item, extracted_list, sentiment) for item, (extracted_list, sentiment) in zip(raw_content, results)]
+
+    # Resolve each distinct name once, with a bounded number of lookups in flight
+    names = [ext.name for _, extracted_list, _ in extracted for ext in extracted_list]
+    if services.enricher.client is None:
+        # One line instead of an error per name; restaurants are kept unresolved
+        logger.warning("GOOGLE_MAPS_API_KEY not set, skipping place lookups")
+        places = {}
+    else:
+        logger.info(f"Looking up {len(set(names))} place(s)")
+        places = await services.enricher.find_places_async(names)
+
+    for item, extracted_list, sentiment in extracted:
         for ext in extracted_list:
-            logger.info(f"Looking up place: {ext.name}")
-            place = enricher.find_place(ext.name)
-            logger.info(f"Place lookup done for {ext.name}: {place.place_id if place else 'None'}")
+            place = places.get(ext.name)
             key = place.place_id if place else ext.name
             
-            if key not in queue:
-                queue[key] = {"ext": ext, "place": place, "mentions": []}
+            entry = queue.get(key)
+            if entry is None:
+                entry = queue[key] = QueuedRestaurant(key=key, ext=ext, place=place)
             
             # Convert ScrapedContent to SocialMention
             mention = SocialMention(
@@ -114,22 +197,17 @@ async def run_pipeline(limit: int = 50):
                 vibe_extracted=ext.vibe,
                 dishes_mentioned=ext.recommended_dishes or []
             )
-            queue[key]["mentions"].append(mention)
+            entry.mentions.append(mention)
 
     logger.info(f"Processing {len(queue)} unique restaurant(s)")
-    for key, data in queue.items():
+    pending: List[QueuedRestaurant] = []
+    for entry in queue.values():
         try:
-            ext, place, mentions = data["ext"], data["place"], data["mentions"]
-            logger.info(f"Processing {ext.name} ({key}): {len(mentions)} mentions")
-            sentiment = None
-            for item in raw_content:
-                extracted_list, sent = extractor.process_content(item)
-                if sent:
-                    sentiment = sent
-                    break
-            buzz, sentiment = calculate_metrics(mentions)
-
-            restaurant = Restaurant(
+            ext, place = entry.ext, entry.place
+            logger.info(f"Processing {ext.name} ({entry.key}): {len(entry.mentions)} mentions")
+            entry.buzz, entry.sentiment = calculate_metrics(entry.mentions)
+
+            entry.restaurant = Restaurant(
                 name=place.name if place else ext.name,
                 slug=create_slug(place.name if place else ext.name),
                 address=place.address if place else "Toronto",
@@ -140,16 +218,53 @@ async def run_pipeline(limit: int = 50):
                 google_maps_url=place.google_maps_url if place else None,
                 vibe=ext.vibe,
                 cuisine_tags=ext.cuisine_tags,
-                embedding=embedder.embed_text(f"{ext.name} {ext.vibe}")
             )
-
-            if supabase:
-                res_id = upsert_restaurant_core(supabase, restaurant)
-                if res_id:
-                    upsert_metrics(supabase, RestaurantMetrics(
-                        restaurant_id=res_id, buzz_score=buzz, sentiment_score=sentiment,
-                        total_mentions=len(mentions), is_trending=(len(mentions) >= 2)
-                    ))
-                    for m in mentions: upsert_mention(supabase, m, res_id)
+            pending.append(entry)
         except Exception as e:
-            logger.error(f"Failed to process {key}: {e}")
+            logger.error(f"Failed to process {entry.key}: {e}")
+
+    # One batched embedding request instead of one round-trip per restaurant
+    try:
+        vectors = await loop.run_in_executor(
+            pool, embedder.embed_extracted_many, [entry.ext for entry in pending]
+        )
+    except Exception as e:
+        logger.error(f"Embedding batch failed, skipping upserts: {e}")
+        return
+
+    for entry, vector in zip(pending, vectors):
+        entry.restaurant.embedding = vector
+
+    if not supabase:
+        return
+
+    # Three bulk round-trips instead of 3 x N single-row upserts
+    try:
+        ids = await loop.run_in_executor(
+            pool, upsert_restaurants, supabase, [entry.restaurant for entry in pending]
+        )
+    except Exception as e:
+        logger.error(f"Restaurant upsert failed: {e}")
+        return
+
+    metrics, mention_rows = [], []
+    for entry, res_id in zip(pending, ids):
+        if not res_id:
+            logger.error(f"No id returned for {entry.key}, skipping its metrics and mentions")
+            continue
+        metrics.append(RestaurantMetrics(
+            restaurant_id=res_id, buzz_score=entry.buzz, sentiment_score=entry.sentiment,
+            total_mentions=len(entry.mentions), is_trending=(len(entry.mentions) >= 2)
+        ))
+        mention_rows.extend((m, res_id) for m in entry.mentions)
+
+    # Metrics and mentions only depend on the restaurant ids, so send them together
+    metrics_result, mentions_result = await asyncio.gather(
+        loop.run_in_executor(pool, upsert_metrics, supabase, metrics),
+        loop.run_in_executor(pool, upsert_mentions, supabase, mention_rows),
+        return_exceptions=True,
+    )
+    if isinstance(metrics_result, Exception):
+        logger.error(f"Metrics upsert failed: {metrics_result}")
+    if isinstance(mentions_result, Exception):
+        logger.error(f"Mentions upsert failed: {mentions_result}")
@@ -7,13 +7,19 @@ Conforms strictly to shared.models.
 
 import os
 import json
+import hashlib
 import re
+import sys
 import time
+import asyncio
 import logging
-from typing import List, Optional, Dict, Tuple
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Dict, Tuple
 
-from groq import Groq
+from groq import APIConnectionError, APIStatusError, Groq
 from dotenv import load_dotenv
+from pydantic import ValidationError
 
 from shared.models import (
     ExtractedRestaurant,
@@ -22,10 +28,39 @@ from shared.models import (
     ScrapedContent,
     SourceType,
 )
+from shared.embeddings.embeddings import get_embedding_service
+from etl.circuit import CircuitBreaker, CircuitOpenError
+from .semantic_cache import SemanticCache
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Items processed concurrently; the shared rate limiter still spaces out Groq calls
+DEFAULT_CONCURRENCY = 10
+# Only skip the LLM call for effectively empty text: one-line comments such as
+# "Pai, get the khao soi" are the main signal in recommendation threads
+MIN_CONTENT_CHARS = 3
+
+# Read once at import; the environment doesn't change during a run
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# Tried in order when the primary model errors out or returns nothing (opt-in; empty by default)
+GROQ_FALLBACK_MODELS = [m.strip() for m in os.getenv("GROQ_FALLBACK_MODELS", "").split(",") if m.strip()]
+
+def _cache_namespace(kind: str, model: str, template: str) -> str:
+    """Cache key prefix: editing a prompt or switching models must not serve old results."""
+    template_hash = hashlib.md5(template.encode("utf-8")).hexdigest()[:8]
+    return f"{kind}:{model}:{template_hash}"
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Only outages trip the Groq breaker: connection errors, timeouts and 5xx.
+    429s and other 4xx are expected (we run close to the rate limit) and are retried."""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    return False
+
 # =============================================================================
 # PROMPTS (Optimized for Llama 3.1)
 # =============================================================================
@@ -60,6 +95,24 @@ Return ONLY a JSON object:
 TEXT:
 {content}"""
 
+_JSON_START = re.compile(r'[\[{]')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """
+    Cut text to at most max_chars without leaving a half word or sentence.
+    Prefers a sentence end in the last quarter of the window, else a word break.
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    if sentence_end >= max_chars * 3 // 4:
+        return cut[:sentence_end + 1]
+    word_end = cut.rfind(" ")
+    return cut[:word_end] if word_end > 0 else cut
+
 # =============================================================================
 # EXTRACTOR CLASS
 # =============================================================================
@@ -69,21 +122,28 @@ class RestaurantExtractor:
     Handles LLM communication to turn raw text into structured restaurant data.
     """
     
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    def __init__(self, cache: Optional[SemanticCache] = None):
+        self.cache = cache
+        self.api_key = GROQ_API_KEY
+        self.model = GROQ_MODEL
+        self.models = [self.model] + [m for m in GROQ_FALLBACK_MODELS if m != self.model]
         self.client = self._init_client()
+        self.breakers = {model: CircuitBreaker(f"groq:{model}", is_failure=_is_upstream_failure) for model in self.models}
         self.last_request_time = 0  # Track last API call for rate limiting
         self.min_interval = 3.0  # 30 RPM = 2 sec, but adding 1 sec buffer for retries/429s
+        self._rate_lock = threading.Lock()
     
     def _rate_limit(self):
-        """Enforce rate limit: 30 requests/minute = 2 sec between calls."""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_interval:
-            sleep_time = self.min_interval - elapsed
+        """Enforce rate limit: 30 requests/minute = 2 sec between calls (thread-safe)."""
+        # Reserve the next free slot under the lock, then sleep outside it
+        with self._rate_lock:
+            now = time.time()
+            slot = max(now, self.last_request_time + self.min_interval)
+            self.last_request_time = slot
+        sleep_time = slot - now
+        if sleep_time > 0:
             logger.info(f"[extractor] Rate limiting: sleeping {sleep_time:.2f}s")
             time.sleep(sleep_time)
-        self.last_request_time = time.time()
     
     def _init_client(self) -> Optional[Groq]:
         if not self.api_key:
@@ -91,35 +151,53 @@ class RestaurantExtractor:
             return None
         return Groq(api_key=self.api_key)
     
-    def _clean_json_response(self, text: str) -> str:
+    def _parse_json_response(self, text: str) -> Optional[Any]:
         """
-        Extremely robust JSON extractor. 
-        Handles markdown blocks, conversational filler, and trailing commas.
+        Decode the first JSON array/object in an LLM response.
+        Ignores markdown fences and "Sure, here is your JSON:" chatter around it,
+        and only reads as far as the value itself.
         """
         if not text:
-            return ""
-        
-        # 1. Try to find the first '[' or '{' and the last ']' or '}'
-        # This ignores LLM "Sure, here is your JSON:" chatter
-        match = re.search(r'(\[.*\]|\{.*\})', text, re.DOTALL)
-        if match:
-            text = match.group(1)
-            
-        # 2. Basic Markdown cleanup
-        text = text.replace("```json", "").replace("```", "").strip()
-        
-        return text
+            return None
+
+        for match in _JSON_START.finditer(text):
+            try:
+                data, _ = _JSON_DECODER.raw_decode(text, match.start())
+                return data
+            except ValueError:
+                # Stray bracket in the prose; try the next one
+                continue
+        return None
 
-    def _call_groq(self, prompt: str, max_tokens: int = 2000, retries: int = 3, force_json: bool = False) -> Optional[str]:
+    def _create_completion(self, **kwargs):
+        self._rate_limit()  # Enforce rate limit before each call
+        return self.client.chat.completions.create(**kwargs)
+
+    def _call_groq(
+        self, prompt: str, max_tokens: int = 2000, retries: int = 3, force_json: bool = False
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Walk the model chain; return the first non-empty response and the model that gave it."""
         if not self.client:
-            return None
-        
+            return None, None
+
+        for i, model in enumerate(self.models):
+            content = self._call_model(model, prompt, max_tokens, retries, force_json)
+            if content and content.strip():
+                if i > 0:
+                    logger.info(f"[extractor] Served by fallback model {model}")
+                return content, model
+            if i < len(self.models) - 1:
+                logger.warning(f"[extractor] {model} gave no response, falling back to {self.models[i + 1]}")
+
+        return None, None
+
+    def _call_model(self, model: str, prompt: str, max_tokens: int, retries: int, force_json: bool) -> Optional[str]:
+        breaker = self.breakers[model]
         for attempt in range(retries):
             try:
-                self._rate_limit()  # Enforce rate limit before each call
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
+                response = breaker.call(
+                    self._create_completion,
+                    model=model,
                     messages=[{"role": "user", "content": prompt}],
                     temperature=0.1, # Keep it deterministic for extraction
                     max_tokens=max_tokens,
@@ -134,7 +212,10 @@ class RestaurantExtractor:
                     else:
                         logger.warning(f"[extractor] Empty response after {retries} retries (likely rate limited)")
                 return content
-                
+
+            except CircuitOpenError:
+                logger.warning(f"[extractor] Circuit open for {model}, skipping call")
+                return None
             except Exception as e:
                 if attempt < retries - 1:
                     logger.warning(f"[extractor] API call failed (attempt {attempt+1}/{retries}): {e}")
@@ -142,83 +223,134 @@ class RestaurantExtractor:
                     time.sleep(5)
                     continue
                 else:
-                    logger.error(f"[extractor] Groq API call failed after {retries} retries: {e}")
+                    logger.error(f"[extractor] Groq API call to {model} failed after {retries} retries: {e}")
                     return None
         
         return None
 
+    def _run_prompt(
+        self,
+        kind: str,
+        template: str,
+        text: str,
+        max_chars: int,
+        normalize: Callable[[Any], Optional[Any]],
+        max_tokens: int = 2000,
+    ) -> Optional[Any]:
+        """
+        Shared path for every LLM task: truncate, check the cache, call Groq,
+        decode the JSON and normalize it. `normalize` validates against the
+        pydantic models, so only results that will build again are cached.
+        """
+        text = _truncate(text, max_chars)
+        if self.cache:
+            # Results from any model in the chain are acceptable, primary first
+            for model in self.models:
+                cached = self.cache.get(_cache_namespace(kind, model, template), text)
+                if cached is not None:
+                    return cached
+
+        logger.info(f"[extractor] Calling Groq API for {kind}...")
+        response, model = self._call_groq(template.format(content=text), max_tokens=max_tokens)
+        if not response or response.strip() == "":
+            logger.warning(f"[extractor] Empty {kind} response from Groq")
+            return None
+
+        data = self._parse_json_response(response)
+        result = normalize(data) if data is not None else None
+        if result is None:
+            logger.warning(f"[extractor] Unusable {kind} response: {response[:200]}")
+            return None
+
+        if self.cache:
+            self.cache.put(_cache_namespace(kind, model, template), text, result)
+        return result
+
+    @staticmethod
+    def _normalize_extraction(data: Any) -> Optional[List[Dict[str, Any]]]:
+        if isinstance(data, dict) and "restaurants" in data:
+            # Sometimes LLM wraps the list in an object
+            data = data["restaurants"]
+        if not isinstance(data, list):
+            return None
+
+        candidates = [item for item in data if isinstance(item, dict) and item.get("name")]
+        valid = []
+        for item in candidates:
+            try:
+                restaurant = ExtractedRestaurant(
+                    name=item["name"],
+                    vibe=item.get("vibe") or "",
+                    cuisine_tags=item.get("cuisine_tags") or [],
+                    recommended_dishes=item.get("recommended_dishes") or [],
+                    price_hint=item.get("price_hint") or "",
+                    sentiment=item.get("sentiment") or "neutral",
+                )
+            except ValidationError as e:
+                # Drop just this restaurant; the rest of the list is still good
+                logger.warning(f"[extractor] Dropping invalid restaurant {item.get('name')!r}: {e.error_count()} error(s)")
+                continue
+            valid.append(restaurant.model_dump(mode="json"))
+
+        if candidates and not valid:
+            # Nothing usable came back; don't cache this as "no restaurants"
+            return None
+        return valid
+
+    @staticmethod
+    def _normalize_sentiment(data: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(data, dict):
+            return None
+
+        # Map string label to Enum value
+        label = str(data.get("label", "neutral")).lower()
+        if label not in {l.value for l in SentimentLabel}:
+            label = SentimentLabel.NEUTRAL.value
+
+        try:
+            sentiment = SentimentAnalysis(
+                overall_score=data.get("overall_score", 0.0),
+                label=label,
+                aspects=data.get("aspects") or {},
+                summary=data.get("summary") or "",
+            )
+        except ValidationError as e:
+            logger.warning(f"[extractor] Invalid sentiment response: {e.error_count()} error(s)")
+            return None
+        return sentiment.model_dump(mode="json")
+
     def extract_restaurants(self, content: ScrapedContent) -> List[ExtractedRestaurant]:
         """Extracts list of restaurants and their attributes."""
         logger.info(f"[extractor] Starting restaurant extraction from: {content.source_url}")
         # Truncate to ~6000 chars to stay safe with context limits and tokens
-        prompt = EXTRACTION_PROMPT.format(content=content.raw_text[:6000])
-        logger.info(f"[extractor] Calling Groq API for extraction...")
-        response = self._call_groq(prompt)
-        logger.info(f"[extractor] Groq response received, parsing...")
-        
-        if not response or response.strip() == "":
-            logger.warning(f"[extractor] Empty response from Groq for {content.source_url}")
-            return []
-        
-        cleaned = self._clean_json_response(response)
-        if not cleaned or cleaned.strip() == "":
-            logger.warning(f"[extractor] Cleaned response was empty after JSON extraction")
-            return []
-            
-        try:
-            data = json.loads(cleaned)
-            if not isinstance(data, list):
-                # Sometimes LLM wraps the list in an object
-                if isinstance(data, dict) and "restaurants" in data:
-                    data = data["restaurants"]
-                else:
-                    logger.warning(f"[extractor] Response not a list: {type(data)}")
-                    return []
-
-            results = []
-            for item in data:
-                if not item.get("name"): continue
-                
-                results.append(ExtractedRestaurant(
-                    name=item.get("name"),
-                    vibe=item.get("vibe", ""),
-                    cuisine_tags=item.get("cuisine_tags", []),
-                    recommended_dishes=item.get("recommended_dishes", []),
-                    price_hint=item.get("price_hint", ""),
-                    sentiment=item.get("sentiment", "neutral")
-                ))
-            logger.info(f"[extractor] Extracted {len(results)} restaurants")
-            return results
-        except Exception as e:
-            logger.error(f"[extractor] Failed to parse extraction JSON: {e} | cleaned_response: {cleaned[:200]}")
+        items = self._run_prompt("extraction", EXTRACTION_PROMPT, content.raw_text, 6000, self._normalize_extraction)
+        if items is None:
             return []
 
+        results = []
+        for item in items:
+            try:
+                results.append(ExtractedRestaurant(**item))
+            except (ValidationError, TypeError) as e:
+                logger.error(f"[extractor] Failed to build extraction result: {e}")
+        # Names key the place lookups and the ingest queue; the same few restaurants
+        # recur across many posts, so share one string object per name
+        for result in results:
+            result.name = sys.intern(result.name)
+        logger.info(f"[extractor] Extracted {len(results)} restaurants")
+        return results
+
     def analyze_sentiment(self, content: ScrapedContent) -> Optional[SentimentAnalysis]:
         """Analyzes the overall tone of the post."""
-        prompt = SENTIMENT_PROMPT.format(content=content.raw_text[:4000])
-        response = self._call_groq(prompt, max_tokens=500)
-        
-        if not response:
+        data = self._run_prompt(
+            "sentiment", SENTIMENT_PROMPT, content.raw_text, 4000, self._normalize_sentiment, max_tokens=500
+        )
+        if data is None:
             return None
-            
-        cleaned = self._clean_json_response(response)
-        try:
-            data = json.loads(cleaned)
-            
-            # Map string label to Enum
-            label_val = data.get("label", "neutral").lower()
-            try:
-                label = SentimentLabel(label_val)
-            except ValueError:
-                label = SentimentLabel.NEUTRAL
 
-            return SentimentAnalysis(
-                overall_score=float(data.get("overall_score", 0.0)),
-                label=label,
-                aspects=data.get("aspects", {}),
-                summary=data.get("summary", "")
-            )
-        except Exception as e:
+        try:
+            return SentimentAnalysis(**data)
+        except (ValidationError, TypeError) as e:
             logger.error(f"Failed to parse sentiment JSON: {e}")
             return None
 
@@ -227,6 +359,12 @@ class RestaurantExtractor:
         Coordinates full processing of a single piece of scraped content.
         Used by ingest.py.
         """
+        text = content.raw_text
+        # isspace() avoids a stripped copy of multi-KB posts just to measure them
+        if len(text) < MIN_CONTENT_CHARS or text.isspace():
+            logger.info(f"[extractor] Skipping empty content: {content.source_url}")
+            return [], None
+
         logger.info(f"LLM Processing: {content.source_url}")
         
         restaurants = self.extract_restaurants(content)
@@ -238,6 +376,53 @@ class RestaurantExtractor:
             
         return restaurants, sentiment
 
+    async def process_content_async(
+        self,
+        content: ScrapedContent,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[List[ExtractedRestaurant], Optional[SentimentAnalysis]]:
+        """Non-blocking process_content; the sync Groq client runs on `executor` (default: loop's pool)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.process_content, content)
+
+    async def process_contents_async(
+        self,
+        contents: List[ScrapedContent],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        executor: Optional[Executor] = None,
+    ) -> List[Tuple[List[ExtractedRestaurant], Optional[SentimentAnalysis]]]:
+        """
+        Process many items concurrently, at most `concurrency` at a time.
+        Results are in input order; an item that raises yields ([], None).
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(content: ScrapedContent):
+            async with semaphore:
+                return await self.process_content_async(content, executor)
+
+        results = await asyncio.gather(*(bounded(c) for c in contents), return_exceptions=True)
+        processed = []
+        for content, result in zip(contents, results):
+            if isinstance(result, Exception):
+                logger.error(f"[extractor] Processing failed for {content.source_url}: {result}")
+                result = ([], None)
+            processed.append(result)
+        return processed
+
+_extractor: Optional[RestaurantExtractor] = None
+def get_extractor() -> RestaurantExtractor:
+    """Shared extractor (one Groq client, rate limiter and LLM cache per process)."""
+    global _extractor
+    if _extractor is None:
+        try:
+            cache = SemanticCache(get_embedding_service())
+        except Exception as e:
+            logger.warning(f"[extractor] LLM cache unavailable, continuing without it: {e}")
+            cache = None
+        _extractor = RestaurantExtractor(cache=cache)
+    return _extractor
+
 # =============================================================================
 # SIMPLE TEST
 # =============================================================================
@@ -0,0 +1,184 @@
+"""
+Semantic LLM Cache
+==================
+Remembers LLM results per input text so re-scraped or re-posted content
+doesn't cost another LLM call.
+
+Lookups try an exact MD5 match first. Namespaces whose kind (the part before
+the first ":") is listed in `semantic_namespaces` (by default only
+"sentiment") then fall back to the nearest stored embedding (cosine
+similarity >= threshold) within the same namespace. Extraction is exact-match only: a near-duplicate post in the same
+thread usually names different restaurants, so reusing its list would
+misattribute mentions.
+
+Entries expire after CACHE_TTL_SECONDS and each namespace keeps at most
+CACHE_MAX_ROWS rows (pruned on open). The semantic scan only looks at the
+newest SEMANTIC_SCAN_ROWS vectors, so a miss costs a bounded amount of work.
+"""
+
+import math
+import time
+import hashlib
+import logging
+import operator
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from shared.embeddings.embeddings import EmbeddingService
+from etl.cache import open_cache_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_SEMANTIC_NAMESPACES = ("sentiment",)
+# Only the head of a post is embedded; that's enough to spot duplicates
+EMBED_MAX_CHARS = 1800
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+CACHE_MAX_ROWS = 20000
+# Vectors compared per semantic lookup (newest first)
+SEMANTIC_SCAN_ROWS = 1000
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def _normalize(vector: List[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+class SemanticCache:
+    """SQLite-backed cache of JSON-serializable LLM results keyed by input text."""
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        db_name: str = "llm_cache",
+        threshold: float = DEFAULT_THRESHOLD,
+        semantic_namespaces: Iterable[str] = DEFAULT_SEMANTIC_NAMESPACES,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.semantic_namespaces = frozenset(semantic_namespaces)
+        self._lock = threading.Lock()
+        self._conn = open_cache_db(db_name)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                namespace TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+        self._prune()
+        # namespace -> [(text_hash, unit vector)] oldest first, loaded lazily
+        self._vectors: Dict[str, List[Tuple[str, array]]] = {}
+
+    def _is_semantic(self, namespace: str) -> bool:
+        # Namespaces look like "<kind>:<model>:<prompt hash>"
+        return namespace.split(":", 1)[0] in self.semantic_namespaces
+
+    def _prune(self):
+        """Drop expired rows and keep the newest CACHE_MAX_ROWS per namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - CACHE_TTL_SECONDS,))
+            self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (PARTITION BY namespace ORDER BY created_at DESC) AS rn
+                        FROM llm_cache
+                    ) WHERE rn > ?
+                )
+                """,
+                (CACHE_MAX_ROWS,),
+            )
+            self._conn.commit()
+
+    def _load_vectors(self, namespace: str) -> List[Tuple[str, array]]:
+        if namespace not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT text_hash, embedding FROM llm_cache WHERE namespace = ? AND embedding IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?",
+                (namespace, SEMANTIC_SCAN_ROWS),
+            ).fetchall()
+            entries = []
+            for text_hash, blob in reversed(rows):
+                vec = array("f")
+                vec.frombytes(blob)
+                entries.append((text_hash, vec))
+            self._vectors[namespace] = entries
+        return self._vectors[namespace]
+
+    def _embed(self, text: str) -> Optional[array]:
+        try:
+            return _normalize(self.embedder.embed_query(text[:EMBED_MAX_CHARS]))
+        except Exception as e:
+            logger.warning(f"[cache] Embedding failed, semantic lookup skipped: {e}")
+            return None
+
+    def _value(self, namespace: str, text_hash: str) -> Optional[Any]:
+        row = self._conn.execute(
+            "SELECT value FROM llm_cache WHERE namespace = ? AND text_hash = ? AND created_at >= ?",
+            (namespace, text_hash, time.time() - CACHE_TTL_SECONDS),
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def get(self, namespace: str, text: str) -> Optional[Any]:
+        """Return the cached value for `text` (or, where allowed, a near-duplicate of it), else None."""
+        text_hash = _text_hash(text)
+        with self._lock:
+            value = self._value(namespace, text_hash)
+        if value is not None:
+            logger.info(f"[cache] Exact hit ({namespace})")
+            return value
+
+        if not self._is_semantic(namespace):
+            return None
+
+        query = self._embed(text)
+        if query is None:
+            return None
+
+        # Snapshot under the lock, scan outside it so workers don't serialize on the dot products
+        with self._lock:
+            candidates = list(self._load_vectors(namespace))
+
+        best_hash, best_score = None, self.threshold
+        for cached_hash, vec in candidates:
+            score = sum(map(operator.mul, query, vec))
+            if score >= best_score:
+                best_hash, best_score = cached_hash, score
+        if best_hash is None:
+            return None
+
+        with self._lock:
+            value = self._value(namespace, best_hash)
+        if value is not None:
+            logger.info(f"[cache] Semantic hit ({namespace}, similarity={best_score:.3f})")
+        return value
+
+    def put(self, namespace: str, text: str, value: Any):
+        """Store `value` for `text`. The embedding is usually served from the embedder's LRU."""
+        text_hash = _text_hash(text)
+        # Exact-match-only namespaces don't need an embedding (or the API call for one)
+        vec = self._embed(text) if self._is_semantic(namespace) else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (namespace, text_hash, embedding, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, text_hash, vec.tobytes() if vec is not None else None, orjson.dumps(value).decode(), time.time()),
+            )
+            self._conn.commit()
+            if vec is not None and namespace in self._vectors:
+                entries = [e for e in self._vectors[namespace] if e[0] != text_hash]
+                entries.append((text_hash, vec))
+                self._vectors[namespace] = entries[-SEMANTIC_SCAN_ROWS:]
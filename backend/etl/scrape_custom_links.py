@@ -13,16 +13,19 @@ import logging
 import asyncio
 from etl.scrapers.content import ContentScraper, FeedConfig
 from etl.db import get_supabase
-from etl.llm.extractor import RestaurantExtractor
-from etl.enrichment import GooglePlacesEnricher
+from etl.llm.extractor import get_extractor
+from etl.enrichment import get_enricher
 from shared.embeddings.embeddings import get_embedding_service
 from etl.scoring import calculate_metrics
-from etl.ingest import price_hint_to_tier
+from etl.ingest import create_slug, price_hint_to_tier
 from shared.models import Restaurant, RestaurantMetrics, SocialMention, SourceType
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+# Top comments fetched per thread; Reddit otherwise expands the whole tree into the feed
+COMMENT_LIMIT = 100
+
 REDDIT_URLS = [
     "https://www.reddit.com/r/FoodToronto/comments/1pyzj19/the_best_foods_you_ate_in_toronto_in_2025/",
     # "https://www.reddit.com/r/FoodToronto/comments/ya0auo/what_restaurants_are_you_most_loyal_to_how/",
@@ -42,20 +45,21 @@ async def main():
     """Scrape ONLY the custom Reddit URLs and insert into DB."""
     scraper = ContentScraper()
     supabase = get_supabase()
-    extractor = RestaurantExtractor()
-    enricher = GooglePlacesEnricher()
+    extractor = get_extractor()
+    enricher = get_enricher()
     embedder = get_embedding_service()
     embedder.load()
     
     # Convert to RSS URLs and scrape
-    rss_urls = [url.rstrip('/') + '.rss' for url in REDDIT_URLS]
+    rss_urls = [f"{url.rstrip('/')}.rss?sort=top&limit={COMMENT_LIMIT}" for url in REDDIT_URLS]
     logger.info(f"Processing {len(rss_urls)} Reddit post(s)...")
     
     all_content = []
     for i, rss_url in enumerate(rss_urls):
         try:
             config = FeedConfig(name=f"Reddit Post {i+1}", feed_url=rss_url)
-            content = scraper.scrape_feed(config, SourceType.SOCIAL, limit=999)
+            # The feed is the post itself followed by its comments
+            content = scraper.scrape_feed(config, SourceType.SOCIAL, limit=COMMENT_LIMIT + 1)
             all_content.extend(content)
             logger.info(f"Scraped {len(content)} items from {rss_url}")
         except Exception as e:
@@ -63,54 +67,45 @@ async def main():
     
     logger.info(f"Total items scraped: {len(all_content)}")
     
+    # Items are extracted concurrently; the extractor's rate limiter still spaces out Groq calls
+    logger.info(f"Extracting restaurants from {len(all_content)} item(s)...")
+    results = await extractor.process_contents_async(all_content)
+    extracted = [(item, extracted_list, sentiment) for item, (extracted_list, sentiment) in zip(all_content, results)]
+
+    # Look every distinct name up at once instead of one round-trip per mention
+    names = [ext.name for _, extracted_list, _ in extracted for ext in extracted_list]
+    try:
+        places = await enricher.find_places_async(names)
+    finally:
+        # Lookups are done for this run; don't leave the gRPC channel open
+        await enricher.aclose()
+
     queue = {}
-    for idx, item in enumerate(all_content):
-        logger.info(f"[{idx+1}/{len(all_content)}] Processing: {item.source_url[:80]}...")
-        extracted_list, sentiment = extractor.process_content(item)
+    for item, extracted_list, sentiment in extracted:
         for ext in extracted_list:
-            place = enricher.find_place(ext.name)
+            place = places.get(ext.name)
             key = place.place_id if place else ext.name
-            
-            if key in queue:
-                queue[key]["mentions"].append(SocialMention(
-                    restaurant_name=ext.name,
-                    source_type=item.source_type,
-                    source_url=item.source_url,
-                    title=item.title,
-                    raw_text=item.raw_text[:3000],
-                    reddit_score=item.reddit_score,
-                    reddit_num_comments=item.reddit_num_comments,
-                    posted_at=item.posted_at,
-                    sentiment_score=sentiment.overall_score if sentiment else 0.0,
-                    sentiment_label=sentiment.label if sentiment else None,
-                    aspects=sentiment.aspects if sentiment else None,
-                    summary=sentiment.summary if sentiment else None,
-                    vibe_extracted=ext.vibe,
-                    dishes_mentioned=ext.recommended_dishes or [],
-                    price_mentioned=ext.price_hint,
-                ))
-            else:
-                queue[key] = {
-                    "ext": ext,
-                    "place": place,
-                    "mentions": [SocialMention(
-                        restaurant_name=ext.name,
-                        source_type=item.source_type,
-                        source_url=item.source_url,
-                        title=item.title,
-                        raw_text=item.raw_text[:3000],
-                        reddit_score=item.reddit_score,
-                        reddit_num_comments=item.reddit_num_comments,
-                        posted_at=item.posted_at,
-                        sentiment_score=sentiment.overall_score if sentiment else 0.0,
-                        sentiment_label=sentiment.label if sentiment else None,
-                        aspects=sentiment.aspects if sentiment else None,
-                        summary=sentiment.summary if sentiment else None,
-                        vibe_extracted=ext.vibe,
-                        dishes_mentioned=ext.recommended_dishes or [],
-                        price_mentioned=ext.price_hint,
-                    )]
-                }
+
+            if key not in queue:
+                queue[key] = {"ext": ext, "place": place, "mentions": []}
+
+            queue[key]["mentions"].append(SocialMention(
+                restaurant_name=ext.name,
+                source_type=item.source_type,
+                source_url=item.source_url,
+                title=item.title,
+                raw_text=item.raw_text[:3000],
+                reddit_score=item.reddit_score,
+                reddit_num_comments=item.reddit_num_comments,
+                posted_at=item.posted_at,
+                sentiment_score=sentiment.overall_score if sentiment else 0.0,
+                sentiment_label=sentiment.label if sentiment else None,
+                aspects=sentiment.aspects if sentiment else None,
+                summary=sentiment.summary if sentiment else None,
+                vibe_extracted=ext.vibe,
+                dishes_mentioned=ext.recommended_dishes or [],
+                price_mentioned=ext.price_hint,
+            ))
     
     logger.info(f"Processing {len(queue)} unique restaurant(s)")
     
@@ -128,7 +123,7 @@ async def main():
                 existing = supabase.table("restaurants").select("id,embedding").eq("google_place_id", place.place_id if place else None).execute()
                 is_new = not existing.data or not existing.data[0].get("embedding")
                 if is_new:
-                    embedding = embedder.embed_text(f"{ext.name} {ext.vibe}")
+                    embedding = embedder.embed_extracted(ext)
                     logger.info(f"[{restaurant_name}] Generated embedding for new positive restaurant")
                 else:
                     logger.info(f"[{restaurant_name}] Skipped embedding (already exists)")
@@ -141,7 +136,7 @@ async def main():
         try:
             restaurant = Restaurant(
                 name=restaurant_name,
-                slug=ext.name.lower().replace(" ", "-").replace("'", ""),
+                slug=create_slug(restaurant_name),
                 address=place.address if place else "Toronto",
                 latitude=place.latitude if place else 0.0,
                 longitude=place.longitude if place else 0.0,
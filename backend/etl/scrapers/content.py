@@ -5,29 +5,65 @@ Scrapes Toronto food blogs and publications via RSS feeds.
 Uses trafilatura for full article extraction when needed.
 """
 
+import calendar
+import gzip
 import logging
 import re
-from datetime import datetime, timedelta
+import time
+import threading
+from datetime import datetime, timezone
 from dataclasses import dataclass, asdict
 from typing import List, Optional
 from enum import Enum
 import argparse
-import json
 import csv
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 
 import feedparser
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil import parser as date_parser
 from dotenv import load_dotenv
 from shared.models import SourceType
 import trafilatura
 from shared.models import ScrapedContent
+from etl.cache import open_cache_db
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+# (connect, read) timeouts for feed requests
+REQUEST_TIMEOUT = (3.05, 10)
+# Feeds fetched at once; matches the session's connection pool size
+MAX_FEED_WORKERS = 10
+
+
+def _build_session() -> requests.Session:
+    """One pooled keep-alive session for all feed fetches, with retry/backoff."""
+    session = requests.Session()
+    # Reddit blocks empty/default user agents
+    session.headers["User-Agent"] = (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    )
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = _build_session()
 
 
 # =============================================================================
@@ -97,9 +133,35 @@ class ContentScraper:
     FOOD_KEYWORDS = frozenset({
         "eat_drink"
     })
+    # One alternation scans the text once for every keyword (longest first)
+    _FOOD_PATTERN = re.compile(
+        "|".join(re.escape(kw.lower()) for kw in sorted(FOOD_KEYWORDS, key=len, reverse=True))
+    )
 
-    def __init__(self):
-        pass
+    def __init__(self, persist_cache: bool = True):
+        # Validators (ETag/Last-Modified) and bodies of the last fetch of each feed
+        self._feed_lock = threading.Lock()
+        self._feed_db = self._open_feed_cache() if persist_cache else None
+
+    def _open_feed_cache(self):
+        try:
+            conn = open_cache_db("feeds")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS feed_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            return conn
+        except Exception as e:
+            logger.warning(f"[scraper] Feed cache unavailable, continuing without it: {e}")
+            return None
 
     # -------------------------------------------------------------------------
     # Helpers
@@ -107,12 +169,21 @@ class ContentScraper:
 
     def _parse_date(self, entry) -> Optional[datetime]:
         """Parse date from RSS entry."""
+        # feedparser has usually already parsed the date into a UTC struct_time
+        for field in ("published_parsed", "updated_parsed", "created_parsed"):
+            val = entry.get(field)
+            if val:
+                try:
+                    return datetime.fromtimestamp(calendar.timegm(val), tz=timezone.utc)
+                except (ValueError, TypeError, OverflowError):
+                    continue
+        # Fall back to parsing the raw string for formats feedparser didn't recognize
         for field in ("published", "updated", "created"):
-            val = getattr(entry, field, None)
+            val = entry.get(field)
             if val:
                 try:
                     return date_parser.parse(val)
-                except (ValueError, TypeError):
+                except (ValueError, TypeError, OverflowError):
                     continue
         return None
 
@@ -124,20 +195,67 @@ class ContentScraper:
 
     def _is_food_related(self, title: str, content: str) -> bool:
         """Check if content is food-related."""
-        text = f"{title} {content}".lower()
-        return any(kw in text for kw in self.FOOD_KEYWORDS)
+        # Keywords are lowercased once at class creation; check the short title
+        # first so most matches never lowercase (or copy) the full body
+        search = self._FOOD_PATTERN.search
+        return search(title.lower()) is not None or search(content.lower()) is not None
 
     def _clean_html(self, html: str) -> str:
         """Strip HTML tags."""
-        return re.sub(r"<[^>]+>", " ", html).strip()
+        return _HTML_TAG.sub(" ", html).strip()
+
+    def _cached_feed(self, url: str) -> Optional[tuple]:
+        if self._feed_db is None:
+            return None
+        with self._feed_lock:
+            return self._feed_db.execute(
+                "SELECT etag, last_modified, body FROM feed_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _store_feed(self, url: str, response: requests.Response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self._feed_db is None or not (etag or last_modified):
+            return
+        with self._feed_lock:
+            self._feed_db.execute(
+                "INSERT OR REPLACE INTO feed_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, response.content, time.time()),
+            )
+            self._feed_db.commit()
 
-    def _is_recent(self, posted_at: Optional[datetime], days_back: int) -> bool:
-        """Check if date is within days_back."""
+    def _fetch_feed(self, url: str):
+        """
+        Fetch over the shared session (keep-alive, retries) and parse.
+        Conditional GET: an unchanged feed answers 304 and the stored body is reused.
+        """
+        cached = self._cached_feed(url)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = _SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached:
+            logger.info(f"[scraper] Feed unchanged, using cached copy: {url}")
+            return feedparser.parse(cached[2])
+        response.raise_for_status()
+        self._store_feed(url, response)
+        return feedparser.parse(response.content)
+
+    def _cutoff_ts(self, days_back: int) -> float:
+        """Epoch seconds of the oldest entry to keep; computed once per feed."""
+        return time.time() - days_back * 86400
+
+    def _is_recent(self, posted_at: Optional[datetime], cutoff_ts: float) -> bool:
+        """Check if date is at or after the cutoff."""
         if not posted_at:
             return True  # Include if no date
-        cutoff = datetime.now() - timedelta(days=days_back)
-        posted_naive = posted_at.replace(tzinfo=None) if posted_at.tzinfo else posted_at
-        return posted_naive >= cutoff
+        # Aware datetimes compare in UTC; naive ones are taken as local time, as before
+        return posted_at.timestamp() >= cutoff_ts
 
     # -------------------------------------------------------------------------
     # Article Extraction
@@ -179,19 +297,13 @@ class ContentScraper:
         results = []
 
         try:
-            # Fetch RSS feed with proper User-Agent (Reddit blocks empty UA)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(config.feed_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            feed = feedparser.parse(response.content)
+            feed = self._fetch_feed(config.feed_url)
 
             if feed.bozo and not feed.entries:
                 logger.warning(f"Failed to parse {config.name}: {feed.bozo_exception}")
                 return results
 
+            cutoff_ts = self._cutoff_ts(days_back)
             for entry in feed.entries[:limit]:
                 title = getattr(entry, "title", "").strip()
                 link = getattr(entry, "link", "").strip()
@@ -199,7 +311,7 @@ class ContentScraper:
                 content = self._clean_html(raw_content)
                 posted_at = self._parse_date(entry)
 
-                if not self._is_recent(posted_at, days_back):
+                if not self._is_recent(posted_at, cutoff_ts):
                     continue
 
                 if config.food_filter and not self._is_food_related(title, content):
@@ -235,65 +347,81 @@ class ContentScraper:
         days_back: int = 30,
         fetch_full_text: bool = False,
     ) -> List[ScrapedContent]:
-        """Scrape all blog RSS feeds."""
-        results = []
-
-        for config in BLOG_FEEDS:
-            items = self.scrape_feed(
+        """Scrape all blog RSS feeds (concurrently; results keep feed order)."""
+        def scrape(config: FeedConfig) -> List[ScrapedContent]:
+            # scrape_feed logs and returns [] on failure, so one bad feed can't sink the rest
+            return self.scrape_feed(
                 config,
                 source_type=SourceType.BLOG,
                 limit=limit_per_feed,
                 days_back=days_back,
                 fetch_full_text=fetch_full_text,
             )
-            results.extend(items)
+
+        workers = min(MAX_FEED_WORKERS, len(BLOG_FEEDS)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blog-feed") as executor:
+            results = list(chain.from_iterable(executor.map(scrape, BLOG_FEEDS)))
 
         logger.info(f"Total from blog feeds: {len(results)}")
         return results
 
-    def scrape_reddit(
+    def _scrape_reddit_feed(
         self,
-        limit_per_feed: int = 50,
-        days_back: int = 7,
+        config: FeedConfig,
+        limit: int,
+        days_back: int,
     ) -> List[ScrapedContent]:
-        """Scrape Reddit RSS feeds."""
+        """Scrape a single subreddit RSS feed."""
         results = []
 
-        for config in REDDIT_FEEDS:
-            try:
-                feed = feedparser.parse(config.feed_url)
-
-                for entry in feed.entries[:limit_per_feed]:
-                    title = getattr(entry, "title", "").strip()
-                    link = getattr(entry, "link", "").strip()
-                    content = self._clean_html(self._get_entry_content(entry))
-                    posted_at = self._parse_date(entry)
-
-                    if not self._is_recent(posted_at, days_back):
-                        continue
-
-                    if config.food_filter and not self._is_food_related(title, content):
-                        continue
-
-                    results.append(
-                        ScrapedContent(
-                            source_type=SourceType.SOCIAL,
-                            source_url=link,
-                            source_id=link,
-                            title=title,
-                            raw_text=content,
-                            subreddit=config.name,
-                            posted_at=posted_at,
-                        )
-                    )
+        try:
+            # Ask Reddit for only as many posts as we keep instead of trimming locally
+            feed = self._fetch_feed(f"{config.feed_url}?limit={limit}")
 
-                logger.info(
-                    f"Scraped {len([r for r in results if r.subreddit == config.name])} "
-                    f"from r/{config.name}"
+            cutoff_ts = self._cutoff_ts(days_back)
+            for entry in feed.entries[:limit]:
+                title = getattr(entry, "title", "").strip()
+                link = getattr(entry, "link", "").strip()
+                content = self._clean_html(self._get_entry_content(entry))
+                posted_at = self._parse_date(entry)
+
+                if not self._is_recent(posted_at, cutoff_ts):
+                    continue
+
+                if config.food_filter and not self._is_food_related(title, content):
+                    continue
+
+                results.append(
+                    ScrapedContent(
+                        source_type=SourceType.SOCIAL,
+                        source_url=link,
+                        source_id=link,
+                        title=title,
+                        raw_text=content,
+                        subreddit=config.name,
+                        posted_at=posted_at,
+                    )
                 )
 
-            except Exception as e:
-                logger.error(f"Error scraping r/{config.name}: {e}")
+            logger.info(f"Scraped {len(results)} from r/{config.name}")
+
+        except Exception as e:
+            logger.error(f"Error scraping r/{config.name}: {e}")
+
+        return results
+
+    def scrape_reddit(
+        self,
+        limit_per_feed: int = 50,
+        days_back: int = 7,
+    ) -> List[ScrapedContent]:
+        """Scrape Reddit RSS feeds (concurrently; results keep feed order)."""
+        def scrape(config: FeedConfig) -> List[ScrapedContent]:
+            return self._scrape_reddit_feed(config, limit=limit_per_feed, days_back=days_back)
+
+        workers = min(MAX_FEED_WORKERS, len(REDDIT_FEEDS)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reddit-feed") as executor:
+            results = list(chain.from_iterable(executor.map(scrape, REDDIT_FEEDS)))
 
         logger.info(f"Total from Reddit: {len(results)}")
         return results
@@ -346,17 +474,23 @@ def _serialize_item(item: ScrapedContent) -> dict:
 
 
 def _write_json(path: Path, items: list):
-    with path.open("w", encoding="utf-8") as f:
-        json.dump([_serialize_item(i) for i in items], f, ensure_ascii=False, indent=2)
+    rows = [_serialize_item(i) for i in items]
+    if path.suffix == ".gz":
+        # Machine-readable dump: compact and gzipped (level 3 is most of the win for little CPU)
+        path.write_bytes(gzip.compress(orjson.dumps(rows), compresslevel=3))
+    else:
+        # orjson encodes straight to UTF-8 bytes; still indented for people reading the file
+        path.write_bytes(orjson.dumps(rows, option=orjson.OPT_INDENT_2))
 
 
 def _write_csv(path: Path, items: list):
-    if not items:
-        path.write_text("")
-        return
+    # Same .gz convention as _write_json
+    opener = gzip.open if path.suffix == ".gz" else open
     rows = [_serialize_item(i) for i in items]
-    fieldnames = list(rows[0].keys())
-    with path.open("w", encoding="utf-8", newline="") as f:
+    with opener(path, "wt", encoding="utf-8", newline="") as f:
+        if not rows:
+            return
+        fieldnames = list(rows[0].keys())
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         for r in rows:
@@ -371,7 +505,7 @@ def main(argv=None):
     parser.add_argument("--blog-days", type=int, default=30, help="Days back for blogs")
     parser.add_argument("--reddit-days", type=int, default=7, help="Days back for reddit")
     parser.add_argument("--fetch-full", action="store_true", help="Fetch full article text when summary is short")
-    parser.add_argument("--output", type=Path, help="Path to write results (json or csv). If omitted, prints to stdout")
+    parser.add_argument("--output", type=Path, help="Path to write results (json or csv; a .gz suffix compresses). If omitted, prints to stdout")
     parser.add_argument("--format", choices=["json", "csv"], default="json", help="Output format when --output is used")
     parser.add_argument("--log-level", default="INFO", help="Logging level")
 
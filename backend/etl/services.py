@@ -1,11 +1,15 @@
 from dataclasses import dataclass
 from typing import Optional
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from shared.embeddings.embeddings import EmbeddingService
+from shared.embeddings.embeddings import EmbeddingService, get_embedding_service
 from .scrapers.content import ContentScraper
-from .llm.extractor import RestaurantExtractor
-from .enrichment import GooglePlacesEnricher
+from .llm.extractor import RestaurantExtractor, get_extractor
+from .enrichment import GooglePlacesEnricher, get_enricher
+
+# Worker threads for blocking I/O (Groq, Google Places, OpenAI, Supabase)
+POOL_MAX_WORKERS = 16
 
 
 @dataclass
@@ -14,6 +18,7 @@ class Services:
     embedder: EmbeddingService
     extractor: RestaurantExtractor
     enricher: GooglePlacesEnricher
+    pool: ThreadPoolExecutor
     content_scraper: Optional[ContentScraper] = None
 
 
@@ -27,22 +32,25 @@ async def create_services(
         async with create_services() as services:
             # use services.embedder, services.extractor, etc.
     """
-    # Initialize services (do blocking init before async work)
-    embedder = EmbeddingService()
-    extractor = RestaurantExtractor()
-    enricher = GooglePlacesEnricher()
+    # Initialize services (do blocking init before async work).
+    # Clients are process-wide singletons so repeated runs reuse their connections.
+    embedder = get_embedding_service()
+    extractor = get_extractor()
+    enricher = get_enricher()
     
     content_scraper = ContentScraper()
+    pool = ThreadPoolExecutor(max_workers=POOL_MAX_WORKERS, thread_name_prefix="etl")
     
     services = Services(
         embedder=embedder,
         extractor=extractor,
         enricher=enricher,
+        pool=pool,
         content_scraper=content_scraper,
     )
     
     try:
         yield services
     finally:
-        # Cleanup if needed (close connections, etc.)
-        pass
\ No newline at end of file
+        await enricher.aclose()
+        pool.shutdown(wait=True)
\ No newline at end of file
@@ -6,7 +6,9 @@ Creates vector embeddings for semantic search using OpenAI.
 
 import os
 import logging
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -17,8 +19,45 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
 DEFAULT_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
+# OpenAI accepts up to 2048 inputs per request; stay well under the token cap
+DEFAULT_BATCH_SIZE = 256
+# Components are rounded to ~float16 resolution; this roughly halves the JSON
+# payload for upserts and search RPCs with no measurable recall loss.
+# Storage savings need a halfvec(1536) column on the database side.
+EMBEDDING_DECIMALS = 5
+# In-process LRU of text -> vector; very long inputs are not worth keeping around
+CACHE_MAX_ENTRIES = 4096
+CACHE_MAX_TEXT_LENGTH = 8192
+
+
+def _quantize(vector: List[float], decimals: Optional[int] = EMBEDDING_DECIMALS) -> List[float]:
+    """Round vector components; `decimals=None` keeps full precision."""
+    if decimals is None:
+        return vector
+    return [round(x, decimals) for x in vector]
+
+
+def _compose(
+    name: Optional[str],
+    vibe: Optional[str] = None,
+    cuisine_tags: Optional[List[str]] = None,
+    dishes: Optional[List[str]] = None,
+) -> str:
+    """
+    Canonical embedding text: "name. vibe. cuisine: a, b. dishes: x, y".
+    Lowercased, with tags/dishes deduped and sorted and empty sections dropped,
+    so the same restaurant always yields the same string (and cache key).
+    """
+    sections = [part.strip().lower() for part in (name, vibe) if part and part.strip()]
+    for label, items in (("cuisine", cuisine_tags), ("dishes", dishes)):
+        values = sorted({item.strip().lower() for item in items or () if item and item.strip()})
+        if values:
+            sections.append(f"{label}: {', '.join(values)}")
+    return ". ".join(sections) or "restaurant"
 
 
 class EmbeddingService:
@@ -27,17 +66,19 @@ class EmbeddingService:
     Used for semantic search in the Belly-Buzz discovery engine.
     """
 
-    def __init__(self, model: str = DEFAULT_MODEL):
+    def __init__(self, model: str = DEFAULT_MODEL, cache_size: int = CACHE_MAX_ENTRIES):
         self.model = model
         self.client: Optional[OpenAI] = None
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     def _get_client(self) -> OpenAI:
         """Get or create OpenAI client."""
         if self.client is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
+            if not OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY not set")
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=OPENAI_API_KEY)
         return self.client
 
     def load(self):
@@ -48,54 +89,99 @@ class EmbeddingService:
             logger.error(f"Failed to load embedding service: {e}")
             raise
 
+    def _cache_get(self, text: str) -> Optional[Tuple[float, ...]]:
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _cache_put(self, text: str, vector: List[float]):
+        if self.cache_size <= 0 or len(text) >= CACHE_MAX_TEXT_LENGTH:
+            return
+        with self._cache_lock:
+            # Stored as tuples so callers can't mutate cached vectors
+            self._cache[text] = tuple(vector)
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
     def embed_text(self, text: str) -> List[float]:
         if not text or not text.strip():
             text = "restaurant"
 
+        cached = self._cache_get(text)
+        if cached is not None:
+            return list(cached)
+
         try:
             response = self._get_client().embeddings.create(
                 input=text,
                 model=self.model,
             )
-            return response.data[0].embedding
+            vector = _quantize(response.data[0].embedding)
         except Exception as e:
             logger.error(f"OpenAI embedding failed: {e}")
             raise
 
+        self._cache_put(text, vector)
+        return vector
+
+    def embed_texts(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[float]]:
+        """
+        Embed many strings with one API call per batch instead of one per string.
+        Returned vectors are in the same order as `texts`.
+        """
+        texts = [t if t and t.strip() else "restaurant" for t in texts]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        # Serve what we can from the cache; only unique misses go to the API
+        misses: "OrderedDict[str, List[int]]" = OrderedDict()
+        for i, text in enumerate(texts):
+            cached = self._cache_get(text)
+            if cached is not None:
+                vectors[i] = list(cached)
+            else:
+                misses.setdefault(text, []).append(i)
+
+        pending = list(misses)
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                response = self._get_client().embeddings.create(
+                    input=chunk,
+                    model=self.model,
+                )
+            except Exception as e:
+                logger.error(f"OpenAI batch embedding failed: {e}")
+                raise
+            # The API tags each result with its input index; don't rely on response order
+            for item in response.data:
+                text = chunk[item.index]
+                vector = _quantize(item.embedding)
+                self._cache_put(text, vector)
+                for i in misses[text]:
+                    vectors[i] = list(vector)
+
+        return vectors
+
     def embed_restaurant(self, restaurant: Restaurant) -> List[float]:
         """
         Create searchable embedding from core restaurant attributes.
         Uses fields available in the normalized Restaurant model.
         """
-        text_parts = []
-
-        if restaurant.name:
-            text_parts.append(restaurant.name)
-
-        if restaurant.vibe:
-            text_parts.append(restaurant.vibe)
-
-        combined_text = ". ".join(text_parts)
-        if not combined_text.strip():
-            combined_text = restaurant.name or "restaurant"
+        return self.embed_text(_compose(restaurant.name, restaurant.vibe, restaurant.cuisine_tags))
 
-        return self.embed_text(combined_text)
+    def embed_restaurants(self, restaurants: List[Restaurant]) -> List[List[float]]:
+        """Batched variant of embed_restaurant."""
+        return self.embed_texts([_compose(r.name, r.vibe, r.cuisine_tags) for r in restaurants])
 
     def embed_extracted(self, extracted: ExtractedRestaurant) -> List[float]:
+        return self.embed_text(_compose(extracted.name, extracted.vibe, extracted.cuisine_tags, extracted.recommended_dishes))
 
-        text_parts = [extracted.name]
-
-        if extracted.vibe:
-            text_parts.append(extracted.vibe)
-
-        if extracted.cuisine_tags:
-            text_parts.append(", ".join(extracted.cuisine_tags))
-
-        if extracted.recommended_dishes:
-            text_parts.append("dishes: " + ", ".join(extracted.recommended_dishes))
-
-        combined_text = ". ".join(text_parts)
-        return self.embed_text(combined_text)
+    def embed_extracted_many(self, extracted: List[ExtractedRestaurant]) -> List[List[float]]:
+        """Batched variant of embed_extracted."""
+        return self.embed_texts([_compose(e.name, e.vibe, e.cuisine_tags, e.recommended_dishes) for e in extracted])
 
     def embed_query(self, query: str) -> List[float]:
         """Create embedding for a natural language search query."""
@@ -3,6 +3,11 @@ from typing import List, Optional, Dict
 from pydantic import BaseModel, Field, field_validator
 from .enums import SourceType, SentimentLabel
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is an ETL dependency; the API may run without it
+    from json import loads as _json_loads
+
 #POST AI OUTPUT
 class SocialMention(BaseModel):
     """Social mention record for database."""
@@ -48,19 +53,11 @@ class SocialMention(BaseModel):
     def coerce_float(cls, v):
         return float(v) if v is not None else 0.0
 
-    @field_validator("posted_at", "scraped_at", mode="before")
-    @classmethod
-    def parse_datetime(cls, v):
-        if isinstance(v, str):
-            return datetime.fromisoformat(v.replace("Z", "+00:00"))
-        return v
-
     @field_validator("dishes_mentioned", mode="before")
     @classmethod
     def coerce_list(cls, v):
         if v is None: return []
         if isinstance(v, str):
-            import json
-            try: return json.loads(v)
-            except: return []
+            try: return _json_loads(v)
+            except ValueError: return []
         return v
\ No newline at end of file
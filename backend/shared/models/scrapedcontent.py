@@ -1,9 +1,12 @@
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel
 from .enums import SourceType
 
-class ScrapedContent(BaseModel):
+# Plain slotted dataclass, not a pydantic model: built once per scraped entry by
+# our own code (never from untrusted input) and never validated or dumped
+@dataclass(slots=True, kw_only=True)
+class ScrapedContent:
     source_type: SourceType
     source_url: str
     source_id: Optional[str] = None
@@ -15,4 +18,4 @@ class ScrapedContent(BaseModel):
     # Social-specific metadata (baselines from results.json)
     subreddit: Optional[str] = None
     reddit_score: int = 0
-    reddit_num_comments: int = 0
\ No newline at end of file
+    reddit_num_comments: int = 0